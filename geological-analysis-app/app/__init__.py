@@ -1,14 +1,61 @@
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from flask_compress import Compress
 import os
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 db = SQLAlchemy()
 login_manager = LoginManager()
+compress = Compress()
+
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider that encodes with orjson, including NumPy values.
+    
+    Dates and types orjson doesn't handle natively fall back to Flask's
+    default conversions, and keys are sorted and indented under the same
+    settings as DefaultJSONProvider, so the output matches jsonify's apart
+    from non-ASCII text, which orjson always writes as UTF-8. Other
+    json.dumps arguments are ignored.
+    """
+    options = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS |
+               orjson.OPT_PASSTHROUGH_DATETIME) if HAS_ORJSON else 0
+    
+    def _options(self, sort_keys, indent):
+        options = self.options
+        if sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        # orjson only supports two-space indentation
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+    
+    def dumps(self, obj, **kwargs):
+        options = self._options(kwargs.get('sort_keys', self.sort_keys), kwargs.get('indent'))
+        return orjson.dumps(obj, default=self.default, option=options).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self._options(self.sort_keys, indent)) + b'\n',
+            mimetype=self.mimetype
+        )
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object('config.Config')
+    if HAS_ORJSON:
+        app.json = ORJSONProvider(app)
     
     # Ensure upload directory exists
     upload_dir = app.config['UPLOAD_FOLDER']
@@ -17,6 +64,7 @@ def create_app():
     
     db.init_app(app)
     login_manager.init_app(app)
+    compress.init_app(app)
     login_manager.login_view = 'app.login'
     
     # User loader callback
@@ -29,7 +77,15 @@ def create_app():
     from app.routes import bp as app_bp
     app.register_blueprint(app_bp)
     
-    with app.app_context():
+    @app.cli.command('init-db')
+    def init_db():
+        """Create the database tables."""
         db.create_all()
     
+    # Table creation is a one-off step (flask init-db); only run it on
+    # startup when explicitly requested
+    if app.config['AUTO_CREATE_DB']:
+        with app.app_context():
+            db.create_all()
+    
     return app
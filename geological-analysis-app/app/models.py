@@ -1,8 +1,16 @@
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+import hashlib
+import time
 
 # We'll define db later in __init__.py to avoid circular imports
 
+# Successful password checks are remembered for a short time so repeated
+# logins skip the deliberately slow key derivation. Entries are keyed by
+# the stored hash and a SHA-256 digest of the password, never the plaintext.
+PASSWORD_CACHE_TTL = 300  # seconds
+_verified_passwords = {}
+
 class User(UserMixin):
     def __init__(self, id, username, password_hash=None):
         self.id = id
@@ -13,7 +21,14 @@ class User(UserMixin):
         self.password_hash = generate_password_hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        key = (self.password_hash, hashlib.sha256(password.encode()).hexdigest())
+        now = time.monotonic()
+        if _verified_passwords.get(key, 0) > now:
+            return True
+        if check_password_hash(self.password_hash, password):
+            _verified_passwords[key] = now + PASSWORD_CACHE_TTL
+            return True
+        return False
 
 # For now, let's use in-memory user storage for simplicity
 # This can be replaced with proper database later
@@ -22,11 +37,11 @@ USERS = {
     2: User(2, 'user', generate_password_hash('user123'))
 }
 
+# Index users by username so login lookups don't scan every user
+USERS_BY_NAME = {user.username: user for user in USERS.values()}
+
 def get_user(user_id):
     return USERS.get(int(user_id))
 
 def get_user_by_username(username):
-    for user in USERS.values():
-        if user.username == username:
-            return user
-    return None
+    return USERS_BY_NAME.get(username)
@@ -1,18 +1,56 @@
-from flask import Blueprint, request, jsonify, render_template, send_from_directory, current_app, flash, redirect, url_for
+from flask import Blueprint, request, jsonify, render_template, send_from_directory, current_app, flash, redirect, url_for, Response, stream_with_context
 from flask_login import login_user, logout_user, login_required, current_user
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 import os
-import json
 from app.utils.image_processing import analyze_geological_image, image_to_array
-from app.utils.data_analysis import load_excel_data, filter_geological_data, analyze_rmr_data, analyze_fracture_data
+from app.utils.data_analysis import load_excel_data, iter_excel_records, dataframe_to_arrow_ipc, filter_geological_data, analyze_rmr_data, analyze_fracture_data, RMR_COLUMNS, FRACTURE_COLUMNS, HAS_PYARROW
 from app.models import get_user_by_username
 
 bp = Blueprint('app', __name__)
 
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'xlsx', 'xls'}
-
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return os.path.splitext(filename)[1][1:].lower() in current_app.config['ALLOWED_EXTENSIONS']
+
+def save_uploaded_file(file):
+    """Save an uploaded file to the upload folder and return its secure filename and path."""
+    filename = secure_filename(file.filename)
+    filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+    # Stream from Werkzeug's spooled temp file in fixed-size chunks
+    file.save(filepath, buffer_size=current_app.config['UPLOAD_CHUNK_SIZE'])
+    return filename, filepath
+
+def wants_stream(filepath):
+    """Whether the client asked for streamed records and the file supports it."""
+    # Row streaming relies on openpyxl's read-only mode, which only reads .xlsx
+    stream = request.args.get('stream', '').lower() in ('1', 'true', 'yes', 'on')
+    return stream and filepath.lower().endswith('.xlsx')
+
+def stream_excel_records(filepath):
+    """Stream the rows of an Excel file as newline-delimited JSON.
+    
+    Returns None if the workbook can't be opened, before any response has
+    been started, so callers can answer with their usual JSON error.
+    """
+    try:
+        chunks = iter_excel_records(filepath)
+    except Exception:
+        current_app.logger.exception('Error opening Excel file for streaming')
+        return None
+    
+    def generate():
+        # Encode with the app's provider so values match the non-streamed responses
+        dumps = current_app.json.dumps
+        for chunk in chunks:
+            yield ''.join(dumps(record) + '\n' for record in chunk)
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@bp.app_errorhandler(RequestEntityTooLarge)
+def file_too_large(error):
+    # Raised from the Content-Length check against MAX_CONTENT_LENGTH,
+    # before any of the request body is read or written to disk
+    limit_mb = current_app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+    return jsonify({'error': f'File too large (limit {limit_mb} MB)'}), 413
 
 @bp.route('/')
 def home():
@@ -31,9 +69,7 @@ def upload_file():
         if file.filename == '':
             return jsonify({'error': 'No selected file'})
         if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
+            filename, _ = save_uploaded_file(file)
             return jsonify({'success': 'File uploaded successfully', 'filename': filename})
     return render_template('upload.html')
 
@@ -45,9 +81,7 @@ def upload_image():
     if file.filename == '':
         return jsonify({'error': 'No selected image'})
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        filename, _ = save_uploaded_file(file)
         return jsonify({'success': True, 'filename': filename})
     return jsonify({'error': 'Invalid file type'})
 
@@ -59,15 +93,17 @@ def upload_excel():
     if file.filename == '':
         return jsonify({'error': 'No selected Excel file'})
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        filename, _ = save_uploaded_file(file)
         return jsonify({'success': True, 'filename': filename})
     return jsonify({'error': 'Invalid file type'})
 
 @bp.route('/serve-image/<filename>')
 def serve_image(filename):
-    return send_from_directory(current_app.config['UPLOAD_FOLDER'], filename)
+    # The upload folder is relative to the working directory (where uploads
+    # are saved), not to the app package that Flask resolves paths against.
+    # Conditional responses let browsers revalidate cached images with a 304.
+    upload_dir = os.path.abspath(current_app.config['UPLOAD_FOLDER'])
+    return send_from_directory(upload_dir, filename, conditional=True)
 
 @bp.route('/api/load-excel-data', methods=['POST'])
 def load_excel_api():
@@ -80,7 +116,21 @@ def load_excel_api():
     if not os.path.exists(filepath):
         return jsonify({'error': 'File not found'})
     
+    if wants_stream(filepath):
+        response = stream_excel_records(filepath)
+        if response is None:
+            return jsonify({'error': 'Failed to load Excel data'})
+        return response
+    
     excel_data = load_excel_data(filepath)
+    if excel_data is not None and request.args.get('format') == 'arrow':
+        # Columnar Arrow IPC stream for clients that can read it (e.g. arrow.js)
+        if not HAS_PYARROW:
+            return jsonify({'error': 'Arrow format is not available (pyarrow not installed)'})
+        try:
+            return Response(dataframe_to_arrow_ipc(excel_data), mimetype='application/vnd.apache.arrow.stream')
+        except Exception as e:
+            return jsonify({'error': str(e)})
     if excel_data is not None:
         # Convert DataFrame to JSON-serializable format
         result = {
@@ -97,11 +147,25 @@ def filter_data_api():
     mode = data.get('mode', 'rmr')  # 'rmr' or 'fracturas'
     filters = data.get('filters', {})
     
+    # Prefer filtering the uploaded file server-side (served from the parse
+    # cache) over records posted back by the client
+    filename = data.get('filename')
+    if filename:
+        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+        if not os.path.exists(filepath):
+            return jsonify({'error': 'File not found'})
+        columns = RMR_COLUMNS if mode == 'rmr' else FRACTURE_COLUMNS
+        records = load_excel_data(filepath, usecols=set(columns) | set(filters))
+        if records is None:
+            return jsonify({'error': 'Failed to load Excel data'})
+    else:
+        records = data.get('data', [])
+    
     try:
         if mode == 'rmr':
-            filtered_data = analyze_rmr_data(data.get('data', []), filters)
+            filtered_data = analyze_rmr_data(records, filters)
         else:
-            filtered_data = analyze_fracture_data(data.get('data', []), filters)
+            filtered_data = analyze_fracture_data(records, filters)
         
         return jsonify({'success': True, 'data': filtered_data})
     except Exception as e:
@@ -175,9 +239,10 @@ def analyze():
     if data_file.filename == '':
         return jsonify({'error': 'No selected data file'})
     if data_file and allowed_file(data_file.filename):
-        filename = secure_filename(data_file.filename)
-        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-        data_file.save(filepath)
+        _, filepath = save_uploaded_file(data_file)
+        if wants_stream(filepath):
+            response = stream_excel_records(filepath)
+            return response if response is not None else jsonify({'results': None})
         results = load_excel_data(filepath)
         return jsonify({'results': results.to_dict('records') if results is not None else None})
     return jsonify({'error': 'Invalid file type'})
@@ -255,7 +255,7 @@ class GeologicalAnalysis {
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({
                     mode: this.state.currentMode,
-                    data: this.state.excelData,
+                    filename: this.state.excelFilename,
                     filters: filters
                 })
             });
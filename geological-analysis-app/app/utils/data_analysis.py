@@ -1,24 +1,153 @@
+from functools import lru_cache
 from openpyxl import load_workbook
 import pandas as pd
 import numpy as np
+import os
 
-def load_excel_data(file_path):
-    """Load data from an Excel file."""
+try:
+    import python_calamine
+    HAS_CALAMINE = True
+except ImportError:
+    HAS_CALAMINE = False
+
+try:
+    import pyarrow as pa
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# RMR classes from worst to best rock. Class i covers ratings from
+# RMR_CLASS_BOUNDS[i - 1] up to, but not including, RMR_CLASS_BOUNDS[i].
+RMR_CLASS_BOUNDS = np.array([20, 40, 60, 80])
+RMR_CLASS_COLORS = np.array([
+    '#ff0000',  # Red - Very poor rock
+    '#ff8000',  # Orange - Poor rock
+    '#ffff00',  # Yellow - Fair rock
+    '#80ff00',  # Light green - Good rock
+    '#00ff00',  # Green - Very good rock
+])
+RMR_CLASS_NAMES = np.array(['Muy Mala', 'Mala', 'Regular', 'Buena', 'Muy Buena'])
+
+# Colors cycled through for fracture families
+FRACTURE_FAMILY_COLORS = ['#ff0000', '#00ff00', '#0000ff', '#ffff00', '#ff00ff', '#00ffff']
+
+# Columns read by analyze_rmr_data and analyze_fracture_data, besides
+# the ones named in the filters
+RMR_COLUMNS = ['RMR', 'X', 'Y']
+FRACTURE_COLUMNS = ['Familia', 'Buzamiento', 'Direccion_Buzamiento', 'X', 'Y']
+
+def load_excel_data(file_path, usecols=None):
+    """Load data from an Excel file.
+    
+    Parsed sheets are cached per file version (path, modification time and
+    size), so reloading an unchanged file skips parsing. The returned frame
+    shares its data with the cache and should be treated as read-only.
+    
+    If usecols is given, only those columns (the ones present in the sheet)
+    are kept, so callers don't carry unused columns through their work.
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError as e:
+        print(f"Error loading Excel file: {e}")
+        return None
+    
+    data = _load_excel_file(os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+    if data is None:
+        return None
+    if usecols is not None:
+        return data[[col for col in data.columns if col in usecols]]
+    return data.copy(deep=False)
+
+@lru_cache(maxsize=32)
+def _load_excel_file(file_path, mtime_ns, size):
+    """Parse an Excel file; cached by load_excel_data on the file version."""
     try:
-        # Try to load with pandas first for better header handling
-        df = pd.read_excel(file_path)
+        # Try to load with pandas first for better header handling,
+        # using the Rust-based calamine reader when it is installed
+        df = pd.read_excel(file_path, engine='calamine' if HAS_CALAMINE else None)
         return df
     except Exception as e:
         print(f"Error loading Excel file with pandas: {e}")
+        workbook = None
         try:
-            # Fallback to openpyxl
-            workbook = load_workbook(filename=file_path)
-            sheet = workbook.active
-            data = pd.DataFrame(sheet.values)
+            # Fallback to openpyxl, streaming rows in read-only mode instead
+            # of building the whole workbook in memory
+            workbook = load_workbook(filename=file_path, read_only=True, data_only=True)
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            data = pd.DataFrame.from_records(rows, columns=header)
+            # Drop the unnamed columns and blank rows pandas trims from the sheet
+            data = data.loc[:, data.columns.notna()].dropna(how='all').reset_index(drop=True)
             return data
         except Exception as e2:
             print(f"Error loading Excel file with openpyxl: {e2}")
             return None
+        finally:
+            if workbook is not None:
+                workbook.close()
+
+def iter_excel_records(file_path, chunk_size=10000):
+    """Return an iterator over the rows of an Excel sheet, in lists of up to
+    chunk_size records.
+    
+    The workbook is opened and its header read before returning, so an
+    unreadable file raises here rather than partway through iteration.
+    Rows are streamed with openpyxl's read-only reader, so memory use is
+    bounded by the chunk size rather than by the size of the sheet.
+    """
+    workbook = load_workbook(filename=file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+    except Exception:
+        workbook.close()
+        raise
+    return _iter_record_chunks(workbook, rows, header, chunk_size)
+
+def _iter_record_chunks(workbook, rows, header, chunk_size):
+    """Yield record chunks for iter_excel_records, closing the workbook at the end."""
+    try:
+        if header is None:
+            return
+        
+        # Match load_excel_data: ignore unnamed columns and blank rows
+        columns = [(i, name) for i, name in enumerate(header) if name is not None]
+        chunk = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            chunk.append({name: row[i] if i < len(row) else None for i, name in columns})
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        workbook.close()
+
+def dataframe_to_arrow_ipc(df):
+    """Serialize a DataFrame as an Arrow IPC stream (columnar, no per-row keys).
+    
+    Object columns Arrow can't type as a whole, such as a date column with
+    some cells typed as text, are sent as strings with missing cells null.
+    """
+    mixed = {}
+    for column in df.columns[df.dtypes == object]:
+        try:
+            pa.array(df[column], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            values = df[column]
+            mixed[column] = values.where(values.isna(), values.astype(str))
+    if mixed:
+        df = df.copy(deep=False)
+        for column, values in mixed.items():
+            df[column] = values
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
 
 def analyze_data(data):
     """Perform basic data analysis on the loaded data."""
@@ -44,129 +173,126 @@ def filter_data(data, column_name, threshold):
         return None
 
 def filter_geological_data(data, filters):
-    """Filter geological data based on multiple criteria."""
+    """Filter geological data based on multiple criteria.
+    
+    A DataFrame is filtered and returned as a DataFrame, so callers can stay
+    in pandas until serialization; a list of records gives a list back.
+    """
+    if isinstance(data, pd.DataFrame):
+        return _filter_df(data, filters)
     if not data:
         return []
     
-    df = pd.DataFrame(data)
-    filtered_df = df.copy()
-    
+    return _filter_df(pd.DataFrame(data), filters).to_dict('records')
+
+def _as_dataframe(data):
+    """Return data as a DataFrame, building one only from a list of records."""
+    if isinstance(data, pd.DataFrame):
+        return data
+    return pd.DataFrame(data or [])
+
+def _column(df, name, default=0):
+    """Return a column of df, or default for every row when it is missing."""
+    if name in df.columns:
+        return df[name]
+    return pd.Series(default, index=df.index)
+
+def _filter_df(df, filters):
+    """Filter a geological DataFrame, returning the matching rows as a DataFrame."""
+    # Combine every criterion into one boolean mask and slice the frame once
+    mask = np.ones(len(df), dtype=bool)
     for filter_key, filter_value in filters.items():
         if filter_key in df.columns and filter_value is not None:
+            column = df[filter_key]
             if isinstance(filter_value, dict):
                 # Range filter
                 if 'min' in filter_value and filter_value['min'] is not None:
-                    filtered_df = filtered_df[filtered_df[filter_key] >= filter_value['min']]
+                    mask &= (column >= filter_value['min']).to_numpy()
                 if 'max' in filter_value and filter_value['max'] is not None:
-                    filtered_df = filtered_df[filtered_df[filter_key] <= filter_value['max']]
+                    mask &= (column <= filter_value['max']).to_numpy()
             else:
                 # Exact match filter
-                filtered_df = filtered_df[filtered_df[filter_key] == filter_value]
+                mask &= (column == filter_value).to_numpy()
     
-    return filtered_df.to_dict('records')
+    return df[mask]
 
 def analyze_rmr_data(data, filters):
     """Analyze RMR (Rock Mass Rating) data with geological criteria."""
-    if not data:
-        return []
-    
-    df = pd.DataFrame(data)
+    df = _as_dataframe(data)
     
     # Apply filters
-    filtered_data = filter_geological_data(data, filters)
-    filtered_df = pd.DataFrame(filtered_data)
+    filtered_df = _filter_df(df, filters)
     
     if filtered_df.empty:
         return []
     
-    # Calculate RMR coordinates and colors based on rating
-    rmr_data = []
-    for _, row in filtered_df.iterrows():
-        rmr_value = row.get('RMR', 0) if 'RMR' in row else 0
-        
-        # Determine color based on RMR value
-        if rmr_value >= 80:
-            color = '#00ff00'  # Green - Very good rock
-            class_name = 'Muy Buena'
-        elif rmr_value >= 60:
-            color = '#80ff00'  # Light green - Good rock
-            class_name = 'Buena'
-        elif rmr_value >= 40:
-            color = '#ffff00'  # Yellow - Fair rock
-            class_name = 'Regular'
-        elif rmr_value >= 20:
-            color = '#ff8000'  # Orange - Poor rock
-            class_name = 'Mala'
-        else:
-            color = '#ff0000'  # Red - Very poor rock
-            class_name = 'Muy Mala'
-        
-        rmr_record = row.to_dict()
-        rmr_record.update({
-            'color': color,
-            'class': class_name,
-            'x': row.get('X', 0),
-            'y': row.get('Y', 0),
-            'rmr_value': rmr_value
-        })
-        rmr_data.append(rmr_record)
-    
-    return rmr_data
+    # Calculate RMR coordinates and colors based on rating, for all rows at once
+    rmr_values = _column(filtered_df, 'RMR')
+    class_codes = _rmr_class_codes(rmr_values.to_numpy(dtype=float, na_value=np.nan))
+    
+    rmr_df = filtered_df.assign(
+        color=RMR_CLASS_COLORS[class_codes],
+        **{'class': RMR_CLASS_NAMES[class_codes]},
+        x=_column(filtered_df, 'X'),
+        y=_column(filtered_df, 'Y'),
+        rmr_value=rmr_values
+    )
+    
+    return rmr_df.to_dict('records')
+
+def _rmr_class_codes(rmr_values):
+    """Return the index into the RMR_CLASS_* tables for each RMR value."""
+    # A single binary-search pass over the bounds classifies every value
+    codes = np.searchsorted(RMR_CLASS_BOUNDS, rmr_values, side='right')
+    codes[np.isnan(rmr_values)] = 0  # Missing ratings count as very poor rock
+    return codes
 
 def analyze_fracture_data(data, filters):
     """Analyze fracture data for structural geology visualization."""
-    if not data:
-        return []
-    
-    df = pd.DataFrame(data)
+    df = _as_dataframe(data)
     
     # Apply filters
-    filtered_data = filter_geological_data(data, filters)
-    filtered_df = pd.DataFrame(filtered_data)
+    filtered_df = _filter_df(df, filters)
     
     if filtered_df.empty:
         return []
     
-    # Group fractures by family and assign colors
-    fracture_families = {}
-    family_colors = ['#ff0000', '#00ff00', '#0000ff', '#ffff00', '#ff00ff', '#00ffff']
+    # Group fractures by family and assign colors in order of first appearance
+    families = _column(filtered_df, 'Familia', 'Unknown')
+    family_codes, _ = pd.factorize(families, use_na_sentinel=False)
+    family_colors = np.array(FRACTURE_FAMILY_COLORS)
     
-    fracture_data = []
-    for _, row in filtered_df.iterrows():
-        family = row.get('Familia', 'Unknown')
-        if family not in fracture_families:
-            color_index = len(fracture_families) % len(family_colors)
-            fracture_families[family] = family_colors[color_index]
-        
-        fracture_record = row.to_dict()
-        fracture_record.update({
-            'color': fracture_families[family],
-            'family': family,
-            'dip': row.get('Buzamiento', 0),
-            'dip_direction': row.get('Direccion_Buzamiento', 0),
-            'x': row.get('X', 0),
-            'y': row.get('Y', 0)
-        })
-        fracture_data.append(fracture_record)
-    
-    return fracture_data
+    fracture_df = filtered_df.assign(
+        color=family_colors[family_codes % len(family_colors)],
+        family=families,
+        dip=_column(filtered_df, 'Buzamiento'),
+        dip_direction=_column(filtered_df, 'Direccion_Buzamiento'),
+        x=_column(filtered_df, 'X'),
+        y=_column(filtered_df, 'Y')
+    )
+    
+    return fracture_df.to_dict('records')
 
 def calculate_excavation_coordinates(data, image_dimensions, scale_factor=1.0):
     """Calculate coordinates for plotting on image based on PK and frente data."""
-    coordinates = []
+    coordinates = list(data)
+    # Read both fields as numbers; blank or non-numeric values become NaN
+    pks = pd.to_numeric(pd.Series([record.get('PK_medio', 0) for record in coordinates], dtype=object),
+                        errors='coerce').to_numpy(dtype=float)
+    frentes = pd.to_numeric(pd.Series([record.get('Frente', 0) for record in coordinates], dtype=object),
+                            errors='coerce').to_numpy(dtype=float)
     
-    for record in data:
-        pk = record.get('PK_medio', 0)
-        frente = record.get('Frente', 0)
-        
-        # Convert geological coordinates to image pixels
-        # This is a simplified conversion - in reality, you'd need proper coordinate transformation
-        x = int((pk * scale_factor) % image_dimensions['width'])
-        y = int((frente * scale_factor) % image_dimensions['height'])
-        
+    # Convert geological coordinates to image pixels for all records at once
+    # This is a simplified conversion - in reality, you'd need proper coordinate transformation
+    # Records with a blank or non-numeric position are left without pixel coordinates
+    finite = np.isfinite(pks) & np.isfinite(frentes)
+    xs = np.mod(pks[finite] * scale_factor, image_dimensions['width']).astype(int).tolist()
+    ys = np.mod(frentes[finite] * scale_factor, image_dimensions['height']).astype(int).tolist()
+    
+    plotted = (record for record, keep in zip(coordinates, finite) if keep)
+    for record, x, y in zip(plotted, xs, ys):
         record['image_x'] = x
         record['image_y'] = y
-        coordinates.append(record)
     
     return coordinates
 
@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from PIL import Image, ImageFilter, ImageDraw
 import numpy as np
 
@@ -8,20 +10,56 @@ except ImportError:
     HAS_OPENCV = False
 
 try:
-    from scipy import ndimage
+    from scipy import ndimage, signal
     HAS_SCIPY = True
 except ImportError:
     HAS_SCIPY = False
 
+# Image modes whose pixels can be handed to OpenCV as plain uint8 arrays
+CV2_MODES = ('L', 'RGB', 'RGBA')
+
+# OpenCV equivalents of PIL's built-in convolution filters
+CV2_FILTER_KERNELS = {
+    'blur': np.array([
+        [1, 1, 1, 1, 1],
+        [1, 0, 0, 0, 1],
+        [1, 0, 0, 0, 1],
+        [1, 0, 0, 0, 1],
+        [1, 1, 1, 1, 1]], dtype=np.float32) / 16,
+    'sharpen': np.array([[-2, -2, -2], [-2, 32, -2], [-2, -2, -2]], dtype=np.float32) / 16,
+    'edge_enhance': np.array([[-1, -1, -1], [-1, 10, -1], [-1, -1, -1]], dtype=np.float32) / 2,
+    'edge_detect': np.array([[-1, -1, -1], [-1, 8, -1], [-1, -1, -1]], dtype=np.float32),
+}
+
 def resize_image(image_path, output_path, size):
     """Resize image to specified dimensions."""
     with Image.open(image_path) as img:
+        if HAS_OPENCV and img.mode in CV2_MODES:
+            # Area interpolation is OpenCV's fast path for downscaling and
+            # gives results comparable to Lanczos for photos, but it is
+            # blocky when enlarging, so upscales keep Lanczos
+            shrinking = size[0] <= img.width and size[1] <= img.height
+            interpolation = cv2.INTER_AREA if shrinking else cv2.INTER_LANCZOS4
+            resized = cv2.resize(np.asarray(img), tuple(size), interpolation=interpolation)
+            Image.fromarray(resized, img.mode).save(output_path)
+            return
         img = img.resize(size, Image.LANCZOS)
         img.save(output_path)
 
 def apply_filter(image_path, filter_type):
     """Apply various filters to enhance geological features."""
     with Image.open(image_path) as img:
+        if HAS_OPENCV and img.mode in CV2_MODES and filter_type in CV2_FILTER_KERNELS:
+            source = np.asarray(img)
+            kernel = CV2_FILTER_KERNELS[filter_type]
+            filtered = cv2.filter2D(source, -1, kernel, borderType=cv2.BORDER_REPLICATE)
+            # PIL leaves the pixels the kernel can't fully cover unfiltered
+            margin = kernel.shape[0] // 2
+            filtered[:margin] = source[:margin]
+            filtered[-margin:] = source[-margin:]
+            filtered[:, :margin] = source[:, :margin]
+            filtered[:, -margin:] = source[:, -margin:]
+            return Image.fromarray(filtered, img.mode)
         if filter_type == 'blur':
             img = img.filter(ImageFilter.BLUR)
         elif filter_type == 'sharpen':
@@ -45,16 +83,23 @@ def save_array_as_image(array, output_path):
     img.save(output_path)
 
 def get_image_dimensions(image_path):
-    """Get image dimensions."""
+    """Get image dimensions from a file path or a binary file-like object.
+    
+    Only the image header is read; the pixels are not decoded.
+    """
     with Image.open(image_path) as img:
         return {'width': img.width, 'height': img.height}
 
+def _load_image(image_path):
+    """Decode an image once, returning its pixel array and dimensions."""
+    with Image.open(image_path) as img:
+        return np.asarray(img), {'width': img.width, 'height': img.height}
+
 def analyze_geological_image(image_path):
     """Perform geological analysis on image."""
     try:
-        # Get basic image properties
-        dimensions = get_image_dimensions(image_path)
-        img_array = image_to_array(image_path)
+        # Get basic image properties and pixels from a single decode
+        img_array, dimensions = _load_image(image_path)
         
         # Basic image analysis
         results = {
@@ -70,10 +115,7 @@ def analyze_geological_image(image_path):
         if HAS_OPENCV:
             try:
                 # Convert to grayscale for analysis
-                if len(img_array.shape) > 2:
-                    gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-                else:
-                    gray = img_array
+                gray = _to_gray(img_array)
                 
                 # Edge detection for fracture analysis
                 edges = cv2.Canny(gray, 50, 150)
@@ -82,7 +124,7 @@ def analyze_geological_image(image_path):
                 contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
                 
                 results['features'] = {
-                    'edge_density': np.sum(edges > 0) / edges.size,
+                    'edge_density': cv2.countNonZero(edges) / edges.size,
                     'contour_count': len(contours),
                     'mean_intensity': np.mean(gray),
                     'std_intensity': np.std(gray)
@@ -90,74 +132,154 @@ def analyze_geological_image(image_path):
                 
             except Exception as e:
                 results['opencv_error'] = str(e)
-                if len(img_array.shape) > 2:
-                    gray = np.mean(img_array, axis=2)
-                else:
-                    gray = img_array
-                    
-                results['features'] = {
-                    'mean_intensity': np.mean(gray),
-                    'std_intensity': np.std(gray),
-                    'min_intensity': np.min(gray),
-                    'max_intensity': np.max(gray)
-                }
+                gray = _to_gray(img_array)
+                results['features'] = _intensity_stats(gray)
         else:
             # Fallback analysis without OpenCV
-            if len(img_array.shape) > 2:
-                gray = np.mean(img_array, axis=2)
-            else:
-                gray = img_array
-                
-            results['features'] = {
-                'mean_intensity': np.mean(gray),
-                'std_intensity': np.std(gray),
-                'min_intensity': np.min(gray),
-                'max_intensity': np.max(gray)
-            }
+            gray = _to_gray(img_array)
+            results['features'] = _intensity_stats(gray)
         
         return results
         
     except Exception as e:
         return {'error': str(e)}
 
+def _to_gray(img_array):
+    """Convert an image array to grayscale with the ITU-R BT.601 weights.
+    
+    8-bit color images stay 8-bit instead of going through a float copy.
+    """
+    if len(img_array.shape) == 2:
+        return img_array
+    if img_array.dtype != np.uint8 or img_array.shape[2] < 3:
+        return np.mean(img_array, axis=2)
+    
+    rgb = img_array[:, :, :3]
+    if HAS_OPENCV:
+        return cv2.cvtColor(np.ascontiguousarray(rgb), cv2.COLOR_RGB2GRAY)
+    
+    # Fixed-point 0.299 R + 0.587 G + 0.114 B, rounded to nearest
+    r, g, b = (rgb[:, :, i].astype(np.uint16) for i in range(3))
+    return ((77 * r + 150 * g + 29 * b + 128) >> 8).astype(np.uint8)
+
+def analyze_geological_images(image_paths, max_workers=None):
+    """Analyze several images in parallel, returning results in input order.
+    
+    Decoding and the OpenCV/NumPy work release the GIL, so threads analyze
+    separate images concurrently.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(analyze_geological_image, image_paths))
+
+def _intensity_stats(gray):
+    """Summarize the intensities of a grayscale pixel array.
+    
+    8-bit images are summarized from their 256-bin histogram, built in a
+    single pass over the pixels instead of one pass per statistic.
+    """
+    if gray.dtype == np.uint8 and gray.size:
+        counts = np.bincount(gray.ravel(), minlength=256)
+        levels = np.arange(256)
+        mean = np.dot(counts, levels) / gray.size
+        present = np.flatnonzero(counts)
+        return {
+            'mean_intensity': mean,
+            'std_intensity': np.sqrt(np.dot(counts, (levels - mean) ** 2) / gray.size),
+            'min_intensity': int(present[0]),
+            'max_intensity': int(present[-1])
+        }
+    
+    return {
+        'mean_intensity': np.mean(gray),
+        'std_intensity': np.std(gray),
+        'min_intensity': np.min(gray),
+        'max_intensity': np.max(gray)
+    }
+
+# Contrast stretch applied by enhance_geological_features, for every 8-bit level
+CONTRAST_LUT = np.clip(1.5 * np.arange(256) - 0.5 * 128, 0, 255).astype(np.uint8)
+
+# Kernels with more nonzero taps than this are convolved through an FFT
+FFT_KERNEL_SIZE = 49
+
+def _convolve(img_array, kernel):
+    """Convolve every channel of an image with a 2-D kernel.
+    
+    Borders are reflected and the result is float32, so negative and
+    overflowing responses survive for the caller to clip.
+    """
+    if HAS_OPENCV:
+        # filter2D correlates, so flip the kernel (and, for even sizes, its
+        # anchor); OpenCV switches to a DFT by itself for large kernels
+        height, width = kernel.shape
+        return cv2.filter2D(img_array, cv2.CV_32F, np.flip(kernel).astype(np.float32),
+                            anchor=((width - 1) // 2, (height - 1) // 2),
+                            borderType=cv2.BORDER_REFLECT)
+    
+    if not HAS_SCIPY:
+        return _sparse_convolve(img_array, kernel)
+    
+    img_array = img_array.astype(np.float32)
+    if len(img_array.shape) > 2:
+        kernel = kernel[:, :, np.newaxis]
+    # ndimage only visits nonzero taps, so sparse kernels stay direct
+    if np.count_nonzero(kernel) <= FFT_KERNEL_SIZE:
+        return ndimage.convolve(img_array, kernel)
+    
+    # FFT cost does not grow with the kernel, so pad with the same reflected
+    # border ndimage uses and keep only the fully overlapping part
+    pad = [((size - 1) // 2, size // 2) for size in kernel.shape]
+    padded = np.pad(img_array, pad, mode='symmetric')
+    return signal.fftconvolve(padded, kernel, mode='valid', axes=(0, 1))
+
+def _sparse_convolve(img_array, kernel):
+    """Convolve with a 2-D kernel as a sum of shifted images, one per nonzero tap.
+    
+    Plain NumPy fallback for _convolve, with the same reflected borders.
+    """
+    height, width = img_array.shape[:2]
+    pad = [((size - 1) // 2, size // 2) for size in kernel.shape]
+    pad += [(0, 0)] * (len(img_array.shape) - 2)
+    padded = np.pad(img_array.astype(np.float32), pad, mode='symmetric')
+    
+    # Convolution correlates with the flipped kernel
+    weights = np.flip(kernel)
+    result = np.zeros(padded[:height, :width].shape, dtype=np.float32)
+    for dy, dx in np.argwhere(weights != 0):
+        result += weights[dy, dx] * padded[dy:dy + height, dx:dx + width]
+    return result
+
 def enhance_geological_features(image_path, enhancement_type='contrast'):
     """Enhance specific geological features in the image."""
     with Image.open(image_path) as img:
         img_array = np.array(img)
         
         if enhancement_type == 'contrast':
-            # Enhance contrast to highlight rock boundaries
-            enhanced = np.clip(1.5 * img_array - 0.5 * 128, 0, 255).astype(np.uint8)
+            # Enhance contrast to highlight rock boundaries; 8-bit images
+            # are mapped through a table of the 256 precomputed levels
+            if img_array.dtype == np.uint8:
+                if HAS_OPENCV:
+                    enhanced = cv2.LUT(img_array, CONTRAST_LUT)
+                else:
+                    enhanced = CONTRAST_LUT[img_array]
+            else:
+                enhanced = np.clip(1.5 * img_array - 0.5 * 128, 0, 255).astype(np.uint8)
         elif enhancement_type == 'fractures':
             # Enhance fractures using edge detection
-            if len(img_array.shape) > 2:
-                gray = np.mean(img_array, axis=2)
-            else:
-                gray = img_array
-            
-            # Simple edge enhancement
-            enhanced = np.zeros_like(img_array)
             kernel = np.array([[-1,-1,-1], [-1,8,-1], [-1,-1,-1]])
             
-            if len(img_array.shape) > 2:
-                for i in range(img_array.shape[2]):
-                    if HAS_SCIPY:
-                        enhanced[:,:,i] = ndimage.convolve(img_array[:,:,i], kernel)
-                    else:
-                        # Simple edge enhancement without scipy
-                        enhanced[:,:,i] = img_array[:,:,i]  # Fallback
-            else:
-                if HAS_SCIPY:
-                    enhanced = ndimage.convolve(img_array, kernel)
-                else:
-                    enhanced = img_array  # Fallback
-            
+            enhanced = _convolve(img_array, kernel)
             enhanced = np.clip(enhanced, 0, 255).astype(np.uint8)
         else:
             enhanced = img_array
         
         return enhanced
 
+@lru_cache(maxsize=256)
+def _hex_to_rgba(color, alpha=128):
+    """Convert a '#rrggbb' color to an RGBA tuple; overlay palettes are small."""
+    return tuple(int(color[i:i+2], 16) for i in (1, 3, 5)) + (alpha,)
+
 def create_overlay_image(base_image_path, overlay_data, output_path):
     """Create an overlay image with geological data points."""
     with Image.open(base_image_path) as img:
@@ -167,11 +289,10 @@ def create_overlay_image(base_image_path, overlay_data, output_path):
         for point in overlay_data:
             x = int(point.get('x', 0))
             y = int(point.get('y', 0))
-            color = point.get('color', '#ff0000')
             radius = point.get('radius', 5)
             
-            # Convert hex color to RGBA
-            color_rgba = tuple(int(color[i:i+2], 16) for i in (1, 3, 5)) + (128,)
+            # Convert hex color to RGBA; repeated colors hit the cache
+            color_rgba = _hex_to_rgba(point.get('color', '#ff0000'))
             
             # Draw circle for data point
             draw.ellipse([x-radius, y-radius, x+radius, y+radius], fill=color_rgba)
@@ -188,6 +309,12 @@ def calculate_distance_pixels(point1, point2):
     dy = point2['y'] - point1['y']
     return np.sqrt(dx*dx + dy*dy)
 
+def calculate_distances_pixels(points1, points2):
+    """Calculate the pixel distances between two equally long lists of points."""
+    start = np.array([(p['x'], p['y']) for p in points1], dtype=float).reshape(-1, 2)
+    end = np.array([(p['x'], p['y']) for p in points2], dtype=float).reshape(-1, 2)
+    return np.hypot(end[:, 0] - start[:, 0], end[:, 1] - start[:, 1])
+
 def pixels_to_real_distance(pixel_distance, scale_factor):
     """Convert pixel distance to real-world distance using scale factor."""
     return pixel_distance * scale_factor
\ No newline at end of file
@@ -1,4 +1,8 @@
-from matplotlib import pyplot as plt
+from io import BytesIO
+from matplotlib import rcParams
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
 import numpy as np
 
 def plot_stereonet(data, title='Stereonet Plot'):
@@ -6,27 +10,47 @@ def plot_stereonet(data, title='Stereonet Plot'):
     Create a stereonet plot from the given data.
 
     Parameters:
-    - data: A list of tuples containing the plunge and azimuth of the geological features.
+    - data: Plunge and azimuth pairs of the geological features, as an (n, 2)
+      array or a list of tuples.
     - title: Title of the plot.
+
+    Returns:
+    - The rendered plot as PNG bytes.
     """
-    fig = plt.figure(figsize=(8, 8))
+    # Render on a standalone Agg canvas; pyplot's global figure registry is
+    # not safe to share between request threads
+    fig = Figure(figsize=(8, 8))
+    FigureCanvasAgg(fig)
     ax = fig.add_subplot(111, polar=True)
 
     # Convert plunge and azimuth to radians
-    plunge = np.radians([d[0] for d in data])
-    azimuth = np.radians([d[1] for d in data])
+    data = np.asarray(data, dtype=float).reshape(-1, 2)
+    plunge = np.radians(data[:, 0])
+    azimuth = np.radians(data[:, 1])
 
-    # Plot the data on the stereonet
-    for p, a in zip(plunge, azimuth):
-        ax.plot([a, a], [0, np.pi/2 - p], marker='o', linestyle='-', markersize=5)
+    # Plot the data on the stereonet as one collection of radial segments,
+    # colored through the property cycle like individual ax.plot calls
+    radius = np.pi/2 - plunge
+    segments = np.stack([
+        np.column_stack([azimuth, np.zeros_like(radius)]),
+        np.column_stack([azimuth, radius]),
+    ], axis=1)
+    cycle = rcParams['axes.prop_cycle'].by_key()['color']
+    colors = [cycle[i % len(cycle)] for i in range(len(segments))]
+    ax.add_collection(LineCollection(segments, colors=colors, linestyle='-'))
+    ax.scatter(np.concatenate([azimuth, azimuth]), np.concatenate([np.zeros_like(radius), radius]),
+               c=colors * 2, marker='o', s=25, zorder=3)
 
     ax.set_title(title, va='bottom')
     ax.set_theta_zero_location('N')
     ax.set_theta_direction(-1)
     ax.set_ylim(0, np.pi/2)
 
-    plt.grid(True)
-    plt.show()
+    ax.grid(True)
+
+    buffer = BytesIO()
+    fig.savefig(buffer, format='png')
+    return buffer.getvalue()
 
 def generate_stereonet_data(features):
     """
@@ -36,11 +60,7 @@ def generate_stereonet_data(features):
     - features: A list of geological features with their plunge and azimuth.
 
     Returns:
-    - data: A list of tuples containing plunge and azimuth.
+    - data: An (n, 2) array of plunge and azimuth pairs.
     """
-    data = []
-    for feature in features:
-        plunge = feature['plunge']
-        azimuth = feature['azimuth']
-        data.append((plunge, azimuth))
-    return data
\ No newline at end of file
+    return np.fromiter(((feature['plunge'], feature['azimuth']) for feature in features),
+                       dtype=np.dtype((float, 2)))
@@ -3,11 +3,23 @@ import os
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your_default_secret_key'
     UPLOAD_FOLDER = 'app/static/uploads'
-    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'xls', 'xlsx'}
+    ALLOWED_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg', 'gif', 'xls', 'xlsx'})
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB limit for uploads
+    UPLOAD_CHUNK_SIZE = 1024 * 1024  # Copy uploads to disk in 1 MB chunks
+    # Let the front-end web server (nginx, Apache) send files via X-Sendfile
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE') == '1'
+
+    # Compress record payloads; their repeated keys shrink several-fold
+    COMPRESS_MIMETYPES = ['application/json', 'application/vnd.apache.arrow.stream']
+    # Flask-Compress buffers a streamed body to compress it, so leave
+    # streamed NDJSON records uncompressed
+    COMPRESS_STREAMS = False
+    COMPRESS_ALGORITHM = ['br', 'gzip']
+    COMPRESS_MIN_SIZE = 1024
 
     # Database configuration (if using a database)
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///site.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    AUTO_CREATE_DB = os.environ.get('AUTO_CREATE_DB') == '1'
 
     # Other configuration settings can be added here as needed
\ No newline at end of file
@@ -0,0 +1,45 @@
+import os
+
+import pandas as pd
+import pytest
+
+from app.utils import data_analysis
+from app.utils.data_analysis import (
+    load_excel_data, dataframe_to_arrow_ipc, iter_excel_records, HAS_PYARROW
+)
+
+SAMPLE_WORKBOOK = os.path.join(os.path.dirname(__file__), os.pardir, 'Tabla General_Caverna.xlsx')
+
+@pytest.mark.skipif(not HAS_PYARROW, reason='pyarrow not installed')
+def test_sample_workbook_converts_to_arrow():
+    import pyarrow as pa
+    
+    df = load_excel_data(SAMPLE_WORKBOOK)
+    table = pa.ipc.open_stream(dataframe_to_arrow_ipc(df)).read_all()
+    
+    assert table.num_rows == len(df)
+    assert table.column_names == [str(column) for column in df.columns]
+    # Fecha mixes datetimes and text cells, so it is sent as strings
+    assert pa.types.is_string(table.schema.field('Fecha').type)
+
+def test_streamed_records_match_loaded_rows():
+    df = load_excel_data(SAMPLE_WORKBOOK)
+    records = [record for chunk in iter_excel_records(SAMPLE_WORKBOOK) for record in chunk]
+    
+    assert len(records) == len(df)
+    assert all(list(record) == df.columns.tolist() for record in records)
+
+def test_openpyxl_fallback_matches_pandas(monkeypatch):
+    expected = load_excel_data(SAMPLE_WORKBOOK)
+    
+    def fail(*args, **kwargs):
+        raise ValueError('reader unavailable')
+    monkeypatch.setattr(pd, 'read_excel', fail)
+    data_analysis._load_excel_file.cache_clear()
+    try:
+        df = load_excel_data(SAMPLE_WORKBOOK)
+    finally:
+        data_analysis._load_excel_file.cache_clear()
+    
+    assert df.shape == expected.shape
+    assert df.columns.tolist() == expected.columns.tolist()
@@ -0,0 +1,60 @@
+import os
+import shutil
+
+import pytest
+
+from flask.json.provider import DefaultJSONProvider
+
+from app import create_app, HAS_ORJSON
+
+SAMPLE_WORKBOOK = os.path.join(os.path.dirname(__file__), os.pardir, 'Tabla General_Caverna.xlsx')
+
+@pytest.fixture
+def client(tmp_path):
+    app = create_app()
+    app.config['UPLOAD_FOLDER'] = str(tmp_path)
+    return app.test_client()
+
+def test_streaming_a_corrupt_workbook_returns_json_error(client, tmp_path):
+    (tmp_path / 'bad.xlsx').write_bytes(b'not a zip file')
+    
+    response = client.post('/api/load-excel-data?stream=1', json={'filename': 'bad.xlsx'})
+    
+    assert response.mimetype == 'application/json'
+    assert response.get_json() == {'error': 'Failed to load Excel data'}
+
+@pytest.mark.parametrize('flag, mimetype', [
+    ('1', 'application/x-ndjson'),
+    ('true', 'application/x-ndjson'),
+    ('0', 'application/json'),
+    ('false', 'application/json'),
+])
+def test_stream_flag_is_parsed(client, tmp_path, flag, mimetype):
+    shutil.copy(SAMPLE_WORKBOOK, tmp_path / 'sample.xlsx')
+    
+    response = client.post(f'/api/load-excel-data?stream={flag}', json={'filename': 'sample.xlsx'})
+    
+    assert response.mimetype == mimetype
+
+@pytest.mark.parametrize('encoding', ['gzip', 'br'])
+def test_compression_does_not_buffer_streamed_records(client, tmp_path, encoding):
+    shutil.copy(SAMPLE_WORKBOOK, tmp_path / 'sample.xlsx')
+    
+    response = client.post('/api/load-excel-data?stream=1', json={'filename': 'sample.xlsx'},
+                           headers={'Accept-Encoding': encoding})
+    
+    assert response.is_streamed
+    assert 'Content-Length' not in response.headers
+    assert 'Content-Encoding' not in response.headers
+
+@pytest.mark.skipif(not HAS_ORJSON, reason='orjson not installed')
+def test_json_responses_match_flask_encoding(client, tmp_path):
+    shutil.copy(SAMPLE_WORKBOOK, tmp_path / 'sample.xlsx')
+    
+    response = client.post('/api/load-excel-data', json={'filename': 'sample.xlsx'})
+    
+    flask_json = DefaultJSONProvider(client.application)
+    # orjson always writes non-ASCII characters as UTF-8
+    flask_json.ensure_ascii = False
+    expected = flask_json.response(response.get_json())
+    assert response.get_data() == expected.get_data()